@@ -13,6 +13,7 @@ from src import config
 from src.config import COOKIES_URL, DOWNLOADS_DIR
 from src.helpers import call, db, start_clients, save_all_cookies, load_translations
 from src.modules.jobs import InactiveCallManager
+from src.modules.utils.thumbnails import close_http_client
 
 __version__ = "1.2.1"
 StartTime = datetime.now()
@@ -60,6 +61,7 @@ class Telegram(Client):
         shutdown_tasks = [
             self.db.close(),
             self.call_manager.stop_scheduler(),
+            close_http_client(),
             super().stop(),
         ]
         await asyncio.gather(*shutdown_tasks)
@@ -175,8 +175,8 @@ class Database:
         return [chat["_id"] async for chat in self.chat_db.find()]
 
     async def get_logger_status(self, bot_id: int) -> bool:
-        if bot_id in self.bot_cache and self.bot_cache[bot_id].get("logger"):
-            return self.bot_cache[bot_id].get("logger")
+        if bot_id in self.bot_cache and "logger" in self.bot_cache[bot_id]:
+            return self.bot_cache[bot_id]["logger"]
 
         bot_data = await self.bot_db.find_one({"_id": bot_id})
         status = bot_data.get("logger", False) if bot_data else False
@@ -199,8 +199,8 @@ class Database:
         self.bot_cache[bot_id] = cached
 
     async def get_auto_end(self, bot_id: int) -> bool:
-        if bot_id in self.bot_cache and self.bot_cache[bot_id].get("auto_end"):
-            return self.bot_cache[bot_id].get("auto_end")
+        if bot_id in self.bot_cache and "auto_end" in self.bot_cache[bot_id]:
+            return self.bot_cache[bot_id]["auto_end"]
 
         bot_data = await self.bot_db.find_one({"_id": bot_id})
         status = bot_data.get("auto_end", True) if bot_data else True
@@ -13,6 +13,7 @@ from urllib.parse import unquote
 
 import aiofiles
 import httpx
+import ujson
 
 from src.config import DOWNLOADS_DIR, API_KEY, API_URL
 from src.logger import LOGGER
@@ -216,7 +217,7 @@ class HttpxClient:
                     duration,
                     response.status_code,
                 )
-                return response.json()
+                return ujson.loads(response.content)
 
             except httpx.RequestError as e:
                 last_error = str(e)
@@ -6,9 +6,12 @@ import asyncio
 import os
 import random
 import re
+import time
+from collections import deque
 from pathlib import Path
 from typing import Any, Optional, Dict, Union
 
+from cachetools import TTLCache
 from py_yt import Playlist, VideosSearch
 from pytdbot import types
 
@@ -18,6 +21,65 @@ from ._downloader import MusicService
 from ._httpx import HttpxClient
 from ..config import API_URL1, API_URL2, DOWNLOADS_DIR, PROXY
 
+COOKIE_DIR = "cookies"
+COOKIE_CACHE_TTL = 30
+STDERR_TAIL_LINES = 50
+YTDLP_MAX_CONCURRENT = 4
+
+# yt-dlp arguments shared by every download; only the format, proxy/cookies
+# and URL are appended per call.
+YTDLP_BASE_PARAMS = (
+    "yt-dlp",
+    "--no-warnings",
+    "--quiet",
+    "--geo-bypass",
+    "--retries",
+    "2",
+    "--continue",
+    "--no-part",
+    "--concurrent-fragments",
+    "3",
+    "--socket-timeout",
+    "10",
+    "-o",
+    f"{DOWNLOADS_DIR}/%(id)s.%(ext)s",
+    "--no-write-thumbnail",
+    "--no-write-info-json",
+    "--no-embed-metadata",
+    "--no-embed-chapters",
+    "--no-embed-subs",
+    "--throttled-rate",
+    "100K",
+    "--retry-sleep",
+    "1",
+)
+YTDLP_VIDEO_FORMAT = (
+    "bestvideo[ext=mp4][height<=1080]+bestaudio[ext=m4a]/best[ext=mp4][height<=1080]"
+)
+YTDLP_AUDIO_FORMAT = "bestaudio[ext=m4a]/bestaudio[ext=mp4]/bestaudio/best"
+
+# Cookie files change rarely, so the directory listing is reused until the
+# TTL expires and only re-read when the directory mtime has changed.
+_cookie_cache: Dict[str, Any] = {"mtime": None, "files": None, "expires": 0.0}
+_cookie_lock = asyncio.Lock()
+
+# Bounds the number of yt-dlp processes downloading at the same time
+_ytdlp_semaphore = asyncio.Semaphore(YTDLP_MAX_CONCURRENT)
+
+# Repeat lookups of the same video or search query within the TTL skip the network
+video_data_cache: TTLCache[str, Dict[str, Any]] = TTLCache(maxsize=1024, ttl=600)
+search_cache: TTLCache[str, list[Dict[str, Any]]] = TTLCache(maxsize=1024, ttl=600)
+
+_httpx_client: Optional[HttpxClient] = None
+
+
+def _get_httpx_client() -> HttpxClient:
+    """Return the shared HttpxClient so connections are kept alive between calls."""
+    global _httpx_client
+    if _httpx_client is None:
+        _httpx_client = HttpxClient()
+    return _httpx_client
+
 
 class YouTubeUtils:
     """Utility class for YouTube-related operations."""
@@ -37,6 +99,20 @@ class YouTubeUtils:
         r"^(?:https?://)?(?:www\.)?youtube\.com/shorts/([\w-]+)",
         re.IGNORECASE,
     )
+    # Video, shorts and playlist URLs fused into one alternation so validation
+    # is a single match; alternatives are tried in the same order as above.
+    YOUTUBE_ANY_PATTERN = re.compile(
+        r"^(?:https?://)?(?:www\.)?(?:"
+        r"(?:youtube\.com|music\.youtube\.com|youtu\.be)/"
+        r"(?:watch\?v=|embed/|v/|shorts/)?(?P<video>[\w-]{11})(?:\?|&|$)"
+        r"|youtube\.com/shorts/(?P<shorts>[\w-]+)"
+        r"|(?:youtube\.com|music\.youtube\.com)/"
+        r"(?:playlist|watch)\?.*\blist=(?P<playlist>[\w-]+)"
+        r")",
+        re.IGNORECASE,
+    )
+    URL_SCHEME_PATTERN = re.compile(r"^https?://", re.IGNORECASE)
+    DURATION_PATTERN = re.compile(r"^(?:(?:(\d+):)?(\d+):)?(\d+)$")
 
     @staticmethod
     def clean_query(query: str) -> str:
@@ -56,42 +132,23 @@ class YouTubeUtils:
         """
         if not url:
             return False
-        return any(
-            pattern.match(url)
-            for pattern in (
-                YouTubeUtils.YOUTUBE_VIDEO_PATTERN,
-                YouTubeUtils.YOUTUBE_PLAYLIST_PATTERN,
-                YouTubeUtils.YOUTUBE_SHORTS_PATTERN,
-            )
-        )
+        return YouTubeUtils.YOUTUBE_ANY_PATTERN.match(url) is not None
 
     @staticmethod
     def _extract_video_id(url: str) -> Optional[str]:
         """Extract video ID from various YouTube URL formats."""
-        for pattern in (
-            YouTubeUtils.YOUTUBE_VIDEO_PATTERN,
-            YouTubeUtils.YOUTUBE_SHORTS_PATTERN,
-        ):
-            if match := pattern.match(url):
-                return match.group(1)
+        if match := YouTubeUtils.YOUTUBE_ANY_PATTERN.match(url):
+            return match.group("video") or match.group("shorts")
         return None
 
     @staticmethod
-    async def normalize_youtube_url(url: str) -> Optional[str]:
+    def normalize_youtube_url(url: str) -> Optional[str]:
         """Normalize different YouTube URL formats to standard watch URL."""
         if not url:
             return None
 
-        # Handle youtu.be short links
-        if "youtu.be/" in url:
-            video_id = url.split("youtu.be/")[1].partition("?")[0].partition("#")[0]
+        if video_id := YouTubeUtils._extract_video_id(url):
             return f"https://www.youtube.com/watch?v={video_id}"
-
-        # Handle YouTube shorts
-        if "youtube.com/shorts/" in url:
-            video_id = url.split("youtube.com/shorts/")[1].split("?")[0]
-            return f"https://www.youtube.com/watch?v={video_id}"
-
         return url
 
     @staticmethod
@@ -114,13 +171,13 @@ class YouTubeUtils:
         if isinstance(duration, dict):
             duration = duration.get("secondsText", "0:00")
 
-        # Get the highest quality thumbnail
+        # Get the highest quality thumbnail; the last entry almost always has one
         cover_url = ""
         if thumbnails := track_data.get("thumbnails"):
-            for thumb in reversed(thumbnails):
-                if url := thumb.get("url"):
-                    cover_url = url
-                    break
+            cover_url = thumbnails[-1].get("url") or next(
+                (url for thumb in reversed(thumbnails) if (url := thumb.get("url"))),
+                "",
+            )
 
         return {
             "id": track_data.get("id", ""),
@@ -133,6 +190,11 @@ class YouTubeUtils:
             "platform": "youtube",
         }
 
+    @staticmethod
+    def format_tracks(tracks: list[Dict[str, Any]]) -> list[Dict[str, Any]]:
+        """Format a batch of track data, skipping entries without an ID."""
+        return [YouTubeUtils.format_track(track) for track in tracks if track.get("id")]
+
     @staticmethod
     async def create_track_info(track_data: Dict[str, Any]) -> TrackInfo:
         """Create TrackInfo from formatted track data."""
@@ -162,35 +224,68 @@ class YouTubeUtils:
         Returns:
             int: Duration in seconds
         """
-        if not duration:
+        if not duration or not isinstance(duration, str):
             return 0
 
+        if match := YouTubeUtils.DURATION_PATTERN.match(duration.strip()):
+            hours, minutes, seconds = match.groups()
+            return int(hours or 0) * 3600 + int(minutes or 0) * 60 + int(seconds)
+
+        # Uncommon shapes (signs, padded fields, extra parts) keep the int() rules
         try:
             parts = list(map(int, duration.split(":")))
             if len(parts) == 3:  # HH:MM:SS
                 return parts[0] * 3600 + parts[1] * 60 + parts[2]
             return parts[0] * 60 + parts[1] if len(parts) == 2 else parts[0]
-        except (ValueError, AttributeError):
+        except ValueError:
             return 0
 
+    @staticmethod
+    def _scan_cookie_dir() -> Optional[list[str]]:
+        """List cookie files in one scandir pass; None if the directory is missing."""
+        try:
+            with os.scandir(COOKIE_DIR) as entries:
+                return [
+                    entry.name
+                    for entry in entries
+                    if entry.name.endswith(".txt") and entry.is_file()
+                ]
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    async def _refresh_cookie_cache() -> None:
+        """Re-scan the cookie directory if it changed since the last scan."""
+        try:
+            mtime = os.stat(COOKIE_DIR).st_mtime
+        except FileNotFoundError:
+            _cookie_cache.update(mtime=None, files=None)
+        else:
+            if mtime != _cookie_cache["mtime"]:
+                files = await asyncio.to_thread(YouTubeUtils._scan_cookie_dir)
+                _cookie_cache.update(mtime=mtime, files=files)
+        _cookie_cache["expires"] = time.monotonic() + COOKIE_CACHE_TTL
+
     @staticmethod
     async def get_cookie_file() -> Optional[str]:
         """Get a random cookie file from the 'cookies' directory."""
-        cookie_dir = "cookies"
         try:
-            if not os.path.exists(cookie_dir):
-                LOGGER.warning("Cookie directory '%s' does not exist.", cookie_dir)
+            if time.monotonic() >= _cookie_cache["expires"]:
+                async with _cookie_lock:
+                    if time.monotonic() >= _cookie_cache["expires"]:
+                        await YouTubeUtils._refresh_cookie_cache()
+
+            cookies_files = _cookie_cache["files"]
+            if cookies_files is None:
+                LOGGER.warning("Cookie directory '%s' does not exist.", COOKIE_DIR)
                 return None
 
-            files = await asyncio.to_thread(os.listdir, cookie_dir)
-            cookies_files = [f for f in files if f.endswith(".txt")]
-
             if not cookies_files:
-                LOGGER.warning("No cookie files found in '%s'.", cookie_dir)
+                LOGGER.warning("No cookie files found in '%s'.", COOKIE_DIR)
                 return None
 
             random_file = random.choice(cookies_files)
-            return os.path.join(cookie_dir, random_file)
+            return os.path.join(COOKIE_DIR, random_file)
         except Exception as e:
             LOGGER.warning("Error accessing cookie directory: %s", e)
             return None
@@ -198,7 +293,7 @@ class YouTubeUtils:
     @staticmethod
     async def fetch_oembed_data(url: str) -> Optional[dict[str, Any]]:
         oembed_url = f"https://www.youtube.com/oembed?url={url}&format=json"
-        data = await HttpxClient().make_request(oembed_url, max_retries=1)
+        data = await _get_httpx_client().make_request(oembed_url, max_retries=1)
         if data:
             video_id = url.split("v=")[1]
             return {
@@ -224,7 +319,7 @@ class YouTubeUtils:
         """
         Download audio or video using the API.
         """
-        httpx = HttpxClient()
+        httpx = _get_httpx_client()
         # Select the appropriate API endpoint based on is_video
         if is_video:
             api_endpoint = f"{API_URL2}{video_id}&format=4k"
@@ -256,6 +351,13 @@ class YouTubeUtils:
                 return None
             return dl.file_path
 
+    @staticmethod
+    async def _drain_stream(stream: asyncio.StreamReader, sink: deque[str]) -> None:
+        """Read a subprocess stream line by line into a bounded buffer."""
+        async for raw in stream:
+            if line := raw.decode(errors="replace").rstrip():
+                sink.append(line)
+
     @staticmethod
     async def download_with_yt_dlp(video_id: str, video: bool) -> Optional[str]:
         """Download media using yt-dlp with optimized parameters.
@@ -267,37 +369,10 @@ class YouTubeUtils:
         Returns:
             Path to downloaded file if successful, None otherwise
         """
-        output_template = f"{str(DOWNLOADS_DIR)}/%(id)s.%(ext)s"
-        format_selector = (
-            "bestvideo[ext=mp4][height<=1080]+bestaudio[ext=m4a]/best[ext=mp4][height<=1080]"
-            if video
-            else "bestaudio[ext=m4a]/bestaudio[ext=mp4]/bestaudio/best"
-        )
         ytdlp_params = [
-            "yt-dlp",
-            "--no-warnings",
-            "--quiet",
-            "--geo-bypass",
-            "--retries",
-            "2",
-            "--continue",
-            "--no-part",
-            "--concurrent-fragments",
-            "3",
-            "--socket-timeout",
-            "10",
-            "-o",
-            output_template,
-            "--no-write-thumbnail",
-            "--no-write-info-json",
-            "--no-embed-metadata",
-            "--no-embed-chapters",
-            "--no-embed-subs",
-            "--throttled-rate",
-            "100K",
-            "--retry-sleep",
-            "1",
-            *["-f", format_selector],
+            *YTDLP_BASE_PARAMS,
+            "-f",
+            YTDLP_VIDEO_FORMAT if video else YTDLP_AUDIO_FORMAT,
         ]
 
         # Proxy or cookies
@@ -313,16 +388,28 @@ class YouTubeUtils:
 
         try:
             LOGGER.debug("Starting yt-dlp download for video ID: %s", video_id)
-            proc = await asyncio.create_subprocess_exec(
-                *ytdlp_params,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
+            async with _ytdlp_semaphore:
+                proc = await asyncio.create_subprocess_exec(
+                    *ytdlp_params,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                )
 
-            stdout, stderr = await proc.communicate()
+                # Keep only the tail of stderr and read the printed path as it arrives
+                stderr_tail: deque[str] = deque(maxlen=STDERR_TAIL_LINES)
+                drain_task = asyncio.create_task(
+                    YouTubeUtils._drain_stream(proc.stderr, stderr_tail)
+                )
+                downloaded_path = ""
+                async for raw in proc.stdout:
+                    if line := raw.decode(errors="replace").strip():
+                        downloaded_path = line
+
+                await drain_task
+                await proc.wait()
 
             if proc.returncode != 0:
-                error_msg = stderr.decode().strip()
+                error_msg = "\n".join(stderr_tail)
                 LOGGER.error(
                     "yt-dlp failed for %s (code %d): %s",
                     video_id,
@@ -331,7 +418,6 @@ class YouTubeUtils:
                 )
                 return None
 
-            downloaded_path = stdout.decode().strip()
             if not downloaded_path:
                 LOGGER.error(
                     "Download completed but no file path returned for %s", video_id
@@ -363,9 +449,8 @@ class YouTubeData(MusicService):
         """
         self.query = YouTubeUtils.clean_query(query) if query else None
 
-    def is_valid(self, url: Optional[str]) -> bool:
-        """Check if URL is valid using YouTubeUtils."""
-        return YouTubeUtils.is_valid_url(url)
+    # Bound directly to skip a forwarding call frame on every validation
+    is_valid = staticmethod(YouTubeUtils.is_valid_url)
 
     async def get_info(self) -> Optional[PlatformTracks]:
         """Get track information from YouTube URL."""
@@ -387,6 +472,9 @@ class YouTubeData(MusicService):
         if self.is_valid(self.query):
             return await self.get_info()
 
+        if tracks := search_cache.get(self.query):
+            return PlatformTracks(tracks=[MusicTrack(**track) for track in tracks])
+
         try:
             search = VideosSearch(self.query, limit=5)
             results = await search.next()
@@ -394,6 +482,7 @@ class YouTubeData(MusicService):
                 return None
 
             tracks = [YouTubeUtils.format_track(video) for video in results["result"]]
+            search_cache[self.query] = tracks
             return PlatformTracks(tracks=[MusicTrack(**track) for track in tracks])
         except Exception as e:
             LOGGER.error(f"Error searching for '{self.query}': {e!r}")
@@ -407,7 +496,7 @@ class YouTubeData(MusicService):
         try:
             url = (
                 self.query
-                if re.match("^https?://", self.query)
+                if YouTubeUtils.URL_SCHEME_PATTERN.match(self.query)
                 else f"https://youtube.com/watch?v={self.query}"
             )
             data = await self._fetch_data(url)
@@ -462,20 +551,35 @@ class YouTubeData(MusicService):
     @staticmethod
     async def _get_video_data(url: str) -> Optional[Dict[str, Any]]:
         """Get YouTube video data from the URL."""
-        normalized_url = await YouTubeUtils.normalize_youtube_url(url)
+        normalized_url = YouTubeUtils.normalize_youtube_url(url)
         if not normalized_url:
             return None
 
-        if data := await YouTubeUtils.fetch_oembed_data(normalized_url):
+        if data := video_data_cache.get(normalized_url):
             return data
 
+        # Start the search fallback alongside oEmbed so a miss doesn't cost
+        # two sequential round-trips.
+        search_task = asyncio.create_task(VideosSearch(normalized_url, limit=1).next())
         try:
-            search = VideosSearch(normalized_url, limit=1)
-            results = await search.next()
+            data = await YouTubeUtils.fetch_oembed_data(normalized_url)
+        except Exception:
+            search_task.cancel()
+            raise
+
+        if data:
+            search_task.cancel()
+            video_data_cache[normalized_url] = data
+            return data
+
+        try:
+            results = await search_task
             if not results or not results.get("result"):
                 return None
 
-            return {"results": [YouTubeUtils.format_track(results["result"][0])]}
+            data = {"results": [YouTubeUtils.format_track(results["result"][0])]}
+            video_data_cache[normalized_url] = data
+            return data
         except Exception as e:
             LOGGER.error(f"Error searching video: {e!r}")
             return None
@@ -488,13 +592,11 @@ class YouTubeData(MusicService):
             if not playlist or not playlist.get("videos"):
                 return None
 
-            return {
-                "results": [
-                    YouTubeUtils.format_track(track)
-                    for track in playlist["videos"]
-                    if track.get("id")  # Only include valid tracks
-                ]
-            }
+            # Large playlists are formatted off the event loop
+            results = await asyncio.to_thread(
+                YouTubeUtils.format_tracks, playlist["videos"]
+            )
+            return {"results": results}
         except Exception as e:
             LOGGER.error(f"Error getting playlist: {e!r}")
             return None
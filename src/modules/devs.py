@@ -2,6 +2,7 @@
 #  Licensed under the GNU AGPL v3.0: https://www.gnu.org/licenses/agpl-3.0.html
 #  Part of the TgMusicBot project. All rights reserved where applicable.
 
+import contextlib
 import inspect
 import io
 import os
@@ -16,6 +17,8 @@ from html import escape
 from sys import version as pyver
 from typing import Any, Optional, Tuple, Union
 
+import aiofiles
+import aiofiles.os
 import psutil
 from meval import meval
 from ntgcalls import __version__ as ntgver
@@ -32,6 +35,8 @@ from src.helpers import db
 from src.modules.utils import Filter
 from src.modules.utils.play_helpers import del_msg, extract_argument
 
+EVAL_TMP_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else "database"
+
 
 def format_exception(
     exp: BaseException, tb: Optional[list[traceback.FrameSummary]] = None
@@ -43,11 +48,11 @@ def format_exception(
     if tb is None:
         tb = traceback.extract_tb(exp.__traceback__)
 
-    # Replace absolute paths with relative paths
-    cwd = os.getcwd()
+    # Replace absolute paths under the working directory with relative paths
+    cwd_prefix = os.getcwd() + os.sep
     for frame in tb:
-        if cwd in frame.filename:
-            frame.filename = os.path.relpath(frame.filename)
+        if frame.filename.startswith(cwd_prefix):
+            frame.filename = frame.filename[len(cwd_prefix) :]
 
     stack = "".join(traceback.format_list(tb))
     msg = str(exp)
@@ -142,9 +147,10 @@ async def exec_eval(c: Client, m: types.Message) -> None:
 <pre language="python">{escape(out)}</pre>"""
 
     if len(result) > 2000:
-        filename = f"database/{uuid.uuid4().hex}.txt"
-        with open(filename, "w", encoding="utf-8") as file:
-            file.write(out)
+        # TDLib uploads from a path, so use a RAM-backed directory when available
+        filename = os.path.join(EVAL_TMP_DIR, f"{uuid.uuid4().hex}.txt")
+        async with aiofiles.open(filename, "w", encoding="utf-8") as file:
+            await file.write(out)
 
         caption = f"""{prefix}<b>ᴇᴠᴀʟ:</b>
     <pre language="python">{escape(code)}</pre>
@@ -158,8 +164,8 @@ async def exec_eval(c: Client, m: types.Message) -> None:
         if isinstance(reply, types.Error):
             c.logger.warning(reply.message)
 
-        if os.path.exists(filename):
-            os.remove(filename)
+        with contextlib.suppress(FileNotFoundError):
+            await aiofiles.os.remove(filename)
 
         return None
 
@@ -186,7 +192,9 @@ async def active_vc(c: Client, message: types.Message) -> None:
 
         return None
 
-    text = f"🎵 <b>Active Voice Chats</b> ({len(active_chats)}):\n\n"
+    summary = f"🎵 <b>Active Voice Chats</b> ({len(active_chats)})"
+    parts = [f"{summary}:\n\n"]
+    length = len(parts[0])
 
     for chat_id in active_chats:
         queue_length = chat_cache.count(chat_id)
@@ -195,14 +203,19 @@ async def active_vc(c: Client, message: types.Message) -> None:
         else:
             song_info = "🔇 No song playing."
 
-        text += (
+        section = (
             f"➤ <b>Chat ID:</b> <code>{chat_id}</code>\n"
             f"📌 <b>Queue Size:</b> {queue_length}\n"
             f"{song_info}\n\n"
         )
+        length += len(section)
+        if length > 4096:
+            # Too long for one message; stop building and send the summary only
+            parts = [summary]
+            break
+        parts.append(section)
 
-    if len(text) > 4096:
-        text = f"🎵 <b>Active Voice Chats</b> ({len(active_chats)})"
+    text = "".join(parts)
 
     reply = await message.reply_text(text, disable_web_page_preview=True)
     if isinstance(reply, types.Error):
@@ -228,9 +241,9 @@ async def logger(c: Client, message: types.Message) -> None:
 
     lang = await db.get_lang(message.chat_id)
     args = extract_argument(message.text)
-    enabled = await db.get_logger_status(c.me.id)
 
     if not args:
+        enabled = await db.get_logger_status(c.me.id)
         status = (
             get_string("enabled", lang) if enabled else get_string("disabled", lang)
         )
@@ -3,12 +3,18 @@
 #  Part of the TgMusicBot project. All rights reserved where applicable.
 
 import asyncio
+import contextlib
+import functools
+import hashlib
 from io import BytesIO
 import os
+import threading
+import time
 
 import httpx
-from PIL import Image, ImageDraw, ImageEnhance, ImageFilter, ImageFont, ImageOps
-from aiofiles.os import path as aiopath
+from cachetools import LRUCache
+from PIL import Image, ImageDraw, ImageEnhance, ImageFilter, ImageFont
+import aiofiles
 import aiofiles.os
 
 from src.helpers import CachedTrack
@@ -21,33 +27,109 @@ FONTS = {
     "tfont": ImageFont.truetype("src/modules/utils/font.ttf", 20),
 }
 
+with Image.open("src/modules/utils/controls.png") as _controls:
+    CONTROLS_IMG = _controls.convert("RGBA")
 
-def resize_youtube_thumbnail(img: Image.Image) -> Image.Image:
+
+def _build_watermark(text: str, shadow_offset: int = 2) -> Image.Image:
     """
-    Resize a YouTube thumbnail to 640x640 while keeping important content.
+    Pre-renders the engraved watermark: a dark shadow under white text.
+    """
+    font = FONTS["tfont"]
+    _, _, right, bottom = font.getbbox(text)
+    size = (right + shadow_offset, bottom + shadow_offset)
+
+    def layer(xy: tuple[int, int], color: tuple[int, int, int]) -> Image.Image:
+        im = Image.new("RGBA", size, (0, 0, 0, 0))
+        ImageDraw.Draw(im).text(xy, text, color, font=font)
+        return im
+
+    shadow = layer((shadow_offset, shadow_offset), (50, 50, 50))
+    return Image.alpha_composite(shadow, layer((0, 0), (255, 255, 255)))
+
+
+WATERMARK = _build_watermark("⎚ Bɪʟʟ∆ Mᴜsɪᴄ")
+WATERMARK_POS = (450, 100)
+
+# Blurred backgrounds keyed by thumbnail URL; tracks sharing artwork (e.g. the
+# Spotify fallback image) skip the blur entirely.
+_background_cache: LRUCache[str, Image.Image] = LRUCache(maxsize=32)
+_background_lock = threading.Lock()
+
+# Caps concurrent CDN fetches and Pillow renders across all gen_thumb calls
+_fetch_semaphore = asyncio.Semaphore(16)
+_render_semaphore = asyncio.Semaphore(os.cpu_count() or 1)
+
+_http_client: httpx.AsyncClient | None = None
+
+THUMBS_DIR = "database/photos"
+# File names of thumbnails already on disk, loaded from THUMBS_DIR on first use
+_saved_thumbs: set[str] | None = None
 
-    It crops the center of the image after resizing.
+# Raw CDN image bytes keyed by sha1(url), so re-rendering skips the download
+IMAGE_CACHE_DIR = "database/thumb_cache"
+IMAGE_CACHE_MAX_BYTES = 200 * 1024 * 1024
+# Seconds before a leftover .tmp from an interrupted write is treated as orphaned
+IMAGE_CACHE_TMP_MAX_AGE = 300
+
+
+def get_saved_thumbs() -> set[str]:
     """
-    try:
-        target_size = 640
-        aspect_ratio = img.width / img.height
+    Returns the set of generated thumbnail file names, listing THUMBS_DIR once.
+    """
+    global _saved_thumbs
+    if _saved_thumbs is None:
+        try:
+            _saved_thumbs = set(os.listdir(THUMBS_DIR))
+        except FileNotFoundError:
+            _saved_thumbs = set()
+    return _saved_thumbs
 
-        if aspect_ratio > 1:
-            new_width = int(target_size * aspect_ratio)
-            new_height = target_size
-        else:
-            new_width = target_size
-            new_height = int(target_size / aspect_ratio)
 
-        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the shared client used for thumbnail fetches, creating it on first use.
+
+    Reusing one client keeps connections to the image CDNs alive between tracks.
+    """
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            timeout=10,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+    return _http_client
 
-        # Crop to 640x640 (center crop)
-        left = (img.width - target_size) // 2
-        top = (img.height - target_size) // 2
-        right = left + target_size
-        bottom = top + target_size
 
-        return img.crop((left, top, right, bottom))
+async def close_http_client() -> None:
+    """
+    Closes the shared thumbnail client, if it was created.
+    """
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def resize_youtube_thumbnail(img: Image.Image) -> Image.Image:
+    """
+    Resize a YouTube thumbnail to 640x640 while keeping important content.
+
+    The centered square is cropped and resized in a single pass, so the side
+    strips are never resampled.
+    """
+    try:
+        target_size = 640
+        side = min(img.width, img.height)
+        left = (img.width - side) / 2
+        top = (img.height - side) / 2
+
+        return img.resize(
+            (target_size, target_size),
+            Image.Resampling.LANCZOS,
+            box=(left, top, left + side, top + side),
+            reducing_gap=2.0,
+        )
     except Exception as e:
         LOGGER.error("YouTube thumbnail resize error: %s", e)
         raise
@@ -68,12 +150,101 @@ def resize_jiosaavn_thumbnail(img: Image.Image) -> Image.Image:
         raise
 
 
+def decode_image(url: str, data: bytes) -> Image.Image:
+    """
+    Decodes fetched image bytes and applies the platform-specific resize.
+    """
+    img = Image.open(BytesIO(data))
+    # Let libjpeg downscale oversized artwork while decoding; no-op otherwise
+    img.draft("RGB", (640, 640))
+    # Only the rounded inset needs alpha; keep the rest of the pipeline RGB
+    img = img.convert("RGB")
+    if url.startswith("https://i.ytimg.com"):
+        img = resize_youtube_thumbnail(img)
+    elif url.startswith("http://c.saavncdn.com") or url.startswith("https://i1.sndcdn"):
+        img = resize_jiosaavn_thumbnail(img)
+    return img
+
+
+def prune_image_cache(max_bytes: int = IMAGE_CACHE_MAX_BYTES) -> None:
+    """
+    Removes the least recently used cached images once the cache exceeds max_bytes.
+
+    Temp files left behind by an interrupted write are removed once stale.
+    """
+    stale_before = time.time() - IMAGE_CACHE_TMP_MAX_AGE
+    entries: list[tuple[float, int, str]] = []
+    try:
+        with os.scandir(IMAGE_CACHE_DIR) as it:
+            for entry in it:
+                try:
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                    if entry.name.endswith(".bin"):
+                        entries.append((st.st_mtime, st.st_size, entry.path))
+                    elif entry.name.endswith(".tmp") and st.st_mtime < stale_before:
+                        os.remove(entry.path)
+                except OSError:
+                    continue  # Removed or replaced under us; skip it
+    except OSError:
+        return
+
+    total = sum(size for _, size, _ in entries)
+    if total <= max_bytes:
+        return
+
+    for _, size, path in sorted(entries):
+        with contextlib.suppress(OSError):
+            os.remove(path)
+        total -= size
+        if total <= max_bytes:
+            break
+
+
+async def read_cached_image(path: str) -> bytes | None:
+    """
+    Returns cached image bytes, or None on a miss or if the entry can't be read.
+    """
+    try:
+        async with aiofiles.open(path, "rb") as file:
+            data = await file.read()
+        # Bump the mtime so eviction treats this entry as recently used
+        await asyncio.to_thread(os.utime, path)
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        LOGGER.warning("Failed to read cached image %s: %s", path, e)
+        return None
+    return data
+
+
+async def write_cached_image(path: str, data: bytes) -> None:
+    """
+    Atomically stores image bytes in the cache, then trims it to size.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{id(data)}.tmp"
+    try:
+        os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+        async with aiofiles.open(tmp_path, "wb") as file:
+            await file.write(data)
+        await aiofiles.os.replace(tmp_path, path)
+        await asyncio.to_thread(prune_image_cache)
+    except Exception as e:
+        LOGGER.warning("Failed to cache image at %s: %s", path, e)
+        with contextlib.suppress(FileNotFoundError):
+            await aiofiles.os.remove(tmp_path)
+
+
 async def fetch_image(url: str) -> Image.Image | None:
     """
     Fetches an image from the given URL, resizes it if necessary for JioSaavn and
     YouTube thumbnails, and returns the loaded image as a PIL Image object, or None on
     failure.
 
+    Downloaded bytes are kept in IMAGE_CACHE_DIR, so only the first fetch of a URL
+    hits the network.
+
     Args:
         url (str): URL of the image to fetch.
 
@@ -84,30 +255,36 @@ async def fetch_image(url: str) -> Image.Image | None:
         LOGGER.warning("No URL provided for image fetch")
         return None
 
+    if url.startswith("https://is1-ssl.mzstatic.com"):
+        url = url.replace("500x500bb.jpg", "600x600bb.jpg")
+
+    key = hashlib.sha1(url.encode()).hexdigest()
+    cache_path = os.path.join(IMAGE_CACHE_DIR, f"{key}.bin")
+    if data := await read_cached_image(cache_path):
+        try:
+            img = await asyncio.to_thread(decode_image, url, data)
+            LOGGER.debug("Image loaded from cache for %s", url)
+            return img
+        except Exception as e:
+            LOGGER.warning("Discarding unreadable cached image %s: %s", cache_path, e)
+
     LOGGER.debug("Fetching image from URL: %s", url)
-    async with httpx.AsyncClient() as client:
-        for attempt in range(3):  # Retry up to 3 times
-            try:
-                if url.startswith("https://is1-ssl.mzstatic.com"):
-                    url = url.replace("500x500bb.jpg", "600x600bb.jpg")
-                response = await client.get(url, timeout=10)  # Increased timeout
-                response.raise_for_status()
-                img = Image.open(BytesIO(response.content)).convert("RGBA")
-                if url.startswith("https://i.ytimg.com"):
-                    img = resize_youtube_thumbnail(img)
-                elif url.startswith("http://c.saavncdn.com") or url.startswith(
-                    "https://i1.sndcdn"
-                ):
-                    img = resize_jiosaavn_thumbnail(img)
-                LOGGER.debug("Image fetched successfully from %s", url)
-                return img
-            except Exception as e:
-                LOGGER.error("Image loading error (attempt %d): %s", attempt + 1, e)
-                if attempt < 2:
-                    await asyncio.sleep(1)  # Wait before retry
-                continue
-        LOGGER.error("Failed to fetch image after 3 attempts: %s", url)
-        return None
+    client = get_http_client()
+    for attempt in range(3):  # Retry up to 3 times
+        try:
+            response = await client.get(url, timeout=10)  # Increased timeout
+            response.raise_for_status()
+            img = await asyncio.to_thread(decode_image, url, response.content)
+            LOGGER.debug("Image fetched successfully from %s", url)
+            await write_cached_image(cache_path, response.content)
+            return img
+        except Exception as e:
+            LOGGER.error("Image loading error (attempt %d): %s", attempt + 1, e)
+            if attempt < 2:
+                await asyncio.sleep(0.5 * 2**attempt)  # Back off before retry
+            continue
+    LOGGER.error("Failed to fetch image after 3 attempts: %s", url)
+    return None
 
 
 def clean_text(text: str, limit: int = 17) -> str:
@@ -122,6 +299,18 @@ def clean_text(text: str, limit: int = 17) -> str:
         return "Unknown"
 
 
+@functools.lru_cache(maxsize=8)
+def rounded_mask(width: int, height: int, radius: int) -> Image.Image:
+    """
+    Returns a rounded-rectangle "L" mask, rasterized once per size and radius.
+
+    The returned image is shared and must not be modified.
+    """
+    mask = Image.new("L", (width, height), 0)
+    ImageDraw.Draw(mask).rounded_rectangle((0, 0, width, height), radius, fill=255)
+    return mask
+
+
 def add_controls(img: Image.Image) -> Image.Image:
     """
     Adds blurred background effect and overlay controls.
@@ -131,25 +320,30 @@ def add_controls(img: Image.Image) -> Image.Image:
         box = (120, 120, 520, 480)
 
         region = img.crop(box)
-        if not os.path.exists("src/modules/utils/controls.png"):
-            LOGGER.error("Controls image not found: src/modules/utils/controls.png")
-            raise FileNotFoundError("Controls image not found")
-        controls = Image.open("src/modules/utils/controls.png").convert("RGBA")
         dark_region = ImageEnhance.Brightness(region).enhance(0.5)
 
-        mask = Image.new("L", dark_region.size, 0)
-        ImageDraw.Draw(mask).rounded_rectangle(
-            (0, 0, box[2] - box[0], box[3] - box[1]), 40, fill=255
-        )
-
+        mask = rounded_mask(box[2] - box[0], box[3] - box[1], 40)
         img.paste(dark_region, box, mask)
-        img.paste(controls, (135, 305), controls)
+        img.paste(CONTROLS_IMG, (135, 305), CONTROLS_IMG)
         return img
     except Exception as e:
         LOGGER.error("Error in add_controls: %s", e)
         raise
 
 
+def get_background(url: str, img: Image.Image) -> Image.Image:
+    """
+    Returns a copy of the cached background for ``url``, building it on a miss.
+    """
+    with _background_lock:
+        bg = _background_cache.get(url)
+    if bg is None:
+        bg = add_controls(img)
+        with _background_lock:
+            _background_cache[url] = bg
+    return bg.copy()
+
+
 def make_sq(image: Image.Image, size: int = 125) -> Image.Image:
     """
     Crops an image into a rounded square.
@@ -167,12 +361,8 @@ def make_sq(image: Image.Image, size: int = 125) -> Image.Image:
         )
         resize = crop.resize((size, size), Image.Resampling.LANCZOS)
 
-        mask = Image.new("L", (size, size), 0)
-        ImageDraw.Draw(mask).rounded_rectangle((0, 0, size, size), radius=30, fill=255)
-
-        rounded = ImageOps.fit(resize, (size, size))
-        rounded.putalpha(mask)
-        return rounded
+        resize.putalpha(rounded_mask(size, size, 30))
+        return resize
     except Exception as e:
         LOGGER.error("Error in make_sq: %s", e)
         raise
@@ -193,68 +383,83 @@ def get_duration(duration: int, time: str = "0:24") -> str:
         return "0:00"
 
 
+def render_thumbnail(
+    url: str, thumb: Image.Image, title: str, artist: str, duration: int
+) -> bytes:
+    """
+    Draws the full thumbnail and returns it encoded as PNG.
+
+    This is CPU-bound and blocking; call it from a worker thread.
+    """
+    bg = get_background(url, thumb)
+    image = make_sq(thumb)
+
+    # Positions
+    paste_x, paste_y = 145, 155
+    bg.paste(image, (paste_x, paste_y), image)
+
+    # Engraved watermark on the right upward side
+    bg.paste(WATERMARK, WATERMARK_POS, WATERMARK)
+
+    draw = ImageDraw.Draw(bg)
+    draw.text((285, 200), title, (255, 255, 255), font=FONTS["tfont"])
+    draw.text((287, 235), artist, (255, 255, 255), font=FONTS["cfont"])
+    draw.text((478, 321), get_duration(duration), (192, 192, 192), font=FONTS["dfont"])
+
+    buf = BytesIO()
+    bg.save(buf, format="PNG", compress_level=1, optimize=False)
+    return buf.getvalue()
+
+
 async def gen_thumb(song: CachedTrack) -> str:
     """
     Generates and saves a thumbnail for the song.
     """
     LOGGER.debug("Starting gen_thumb for track_id: %s", song.track_id)
-    save_dir = f"database/photos/{song.track_id}.png"
-    
+    filename = f"{song.track_id}.png"
+    save_dir = f"{THUMBS_DIR}/{filename}"
+
     # Check if thumbnail already exists
-    if await aiopath.exists(save_dir):
+    if filename in get_saved_thumbs():
         LOGGER.debug("Thumbnail already exists at %s", save_dir)
         return save_dir
 
     try:
         # Ensure save directory exists
-        os.makedirs("database/photos", exist_ok=True)
+        os.makedirs(THUMBS_DIR, exist_ok=True)
         
         title, artist = clean_text(song.name), clean_text(song.artist or "Spotify")
         duration = song.duration or 0
 
         # Fetch thumbnail
-        thumb = await fetch_image(song.thumbnail)
+        async with _fetch_semaphore:
+            thumb = await fetch_image(song.thumbnail)
         if not thumb:
             LOGGER.error("Failed to fetch thumbnail for track_id: %s", song.track_id)
             return ""
 
-        # Process Image
-        bg = add_controls(thumb)
-        image = make_sq(thumb)
-
-        # Positions
-        paste_x, paste_y = 145, 155
-        bg.paste(image, (paste_x, paste_y), image)
-
-        draw = ImageDraw.Draw(bg)
-        
-        # Engraved effect for "⎚ Bɪʟʟ∆ Mᴜsɪᴄ" on the right upward side
-        text = "⎚ Bɪʟʟ∆ Mᴜsɪᴄ"
-        text_x, text_y = 450, 100  # Right upward side
-        shadow_offset = 2  # Offset for engraved effect
-        shadow_color = (50, 50, 50)  # Darker color for shadow
-        main_color = (255, 255, 255)  # White for main text
-        bold_font = ImageFont.truetype("src/modules/utils/font.ttf", 20)  # tfont for bold effect
-
-        # Draw shadow text for engraved effect
-        draw.text((text_x + shadow_offset, text_y + shadow_offset), text, shadow_color, font=bold_font)
-        # Draw main text
-        draw.text((text_x, text_y), text, main_color, font=bold_font)
-        
-        draw.text((285, 200), title, (255, 255, 255), font=FONTS["tfont"])
-        draw.text((287, 235), artist, (255, 255, 255), font=FONTS["cfont"])
-        draw.text((478, 321), get_duration(duration), (192, 192, 192), font=FONTS["dfont"])
-
-        # Save the image
-        await asyncio.to_thread(bg.save, save_dir, format="PNG")
-        if await aiopath.exists(save_dir):
-            LOGGER.debug("Thumbnail saved successfully at %s", save_dir)
-            return save_dir
-        else:
-            LOGGER.error("Failed to save thumbnail at %s", save_dir)
-            return ""
+        # Render off the event loop, then write the encoded PNG
+        async with _render_semaphore:
+            data = await asyncio.to_thread(
+                render_thumbnail, song.thumbnail, thumb, title, artist, duration
+            )
+        async with aiofiles.open(save_dir, "wb") as file:
+            await file.write(data)
+        get_saved_thumbs().add(filename)
+        LOGGER.debug("Thumbnail saved successfully at %s", save_dir)
+        return save_dir
     except Exception as e:
         LOGGER.error("Error in gen_thumb for track_id %s: %s", song.track_id, e)
         return ""
     finally:
         LOGGER.debug("Completed gen_thumb for track_id: %s", song.track_id)
+
+
+async def gen_thumbs_bulk(songs: list[CachedTrack]) -> list[str]:
+    """
+    Generates thumbnails for several songs concurrently.
+
+    Fetches and renders are bounded by the module semaphores, so large batches
+    overlap network I/O without oversubscribing the CPU.
+    """
+    return list(await asyncio.gather(*(gen_thumb(song) for song in songs)))